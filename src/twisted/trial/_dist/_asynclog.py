@@ -0,0 +1,137 @@
+# -*- test-case-name: twisted.trial._dist.test.test_asynclog -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Write the overall disttrial test log without blocking the reactor.
+
+Output from every worker is copied into a single log file.  Writing to that
+file from the reactor thread means a slow disk stalls result reporting for all
+of the workers, so the writes are handed off to a background thread instead.
+"""
+
+import atexit
+from queue import SimpleQueue
+from threading import Event, Thread
+from typing import List, TextIO, Union
+
+from twisted.logger import Logger
+
+
+class AsyncLogWriter:
+    """
+    A write-only file-like object which passes everything written to it on to
+    another file from a background thread.
+
+    @ivar _file: The file which is eventually written to.
+
+    @ivar _queue: Text waiting to be written, interleaved with an L{Event}
+        for each call to L{flush} which is waiting for the text before it to be
+        written, and followed by L{None} once the writer has been closed.
+
+    @ivar _thread: The thread writing the contents of C{_queue} to C{_file}.
+
+    @ivar _closing: C{True} once L{close} has been called.
+    """
+
+    _logger = Logger()
+
+    def __init__(self, file: TextIO) -> None:
+        """
+        @param file: The file to write to.  It is closed when this writer is
+            closed and should not be used directly in the meantime.
+        """
+        self._file = file
+        self._queue: "SimpleQueue[Union[str, Event, None]]" = SimpleQueue()
+        self._closing = False
+        # The thread is a daemon so that a writer which is never closed does
+        # not keep the process running.  Closing it at exit makes sure that
+        # nothing which was written to it is lost anyway.
+        self._thread = Thread(
+            target=self._drain, name=f"AsyncLogWriter({file.name})", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def name(self) -> str:
+        """
+        The name of the underlying file.
+        """
+        return self._file.name
+
+    @property
+    def closed(self) -> bool:
+        """
+        Whether the underlying file has been closed.
+        """
+        return self._file.closed
+
+    def write(self, data: str) -> int:
+        """
+        Queue some text to be written to the underlying file.
+
+        @raise ValueError: If this writer has been closed.
+        """
+        if self._closing:
+            raise ValueError("I/O operation on closed file.")
+        self._queue.put(data)
+        return len(data)
+
+    def flush(self) -> None:
+        """
+        Wait for all queued text to be written to the underlying file and for
+        the file to be flushed.
+
+        There is no need to call this just to keep the file up to date.  The
+        background thread flushes the file each time it catches up with the
+        queued writes.
+
+        @raise ValueError: If this writer has been closed.
+        """
+        if self._closing:
+            raise ValueError("I/O operation on closed file.")
+        flushed = Event()
+        self._queue.put(flushed)
+        flushed.wait()
+
+    def close(self) -> None:
+        """
+        Wait for all queued text to be written and then close the underlying
+        file.
+        """
+        if self._closing:
+            return
+        self._closing = True
+        atexit.unregister(self.close)
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+
+    def _drain(self) -> None:
+        """
+        Write queued text to the underlying file, in batches of whatever has
+        accumulated since the last write, until L{None} is dequeued.  Each
+        L{Event} dequeued is set once the batch it arrived in is written.
+        """
+        while True:
+            batch: List[str] = []
+            flushed: List[Event] = []
+            item = self._queue.get()
+            while item is not None:
+                if isinstance(item, Event):
+                    flushed.append(item)
+                else:
+                    batch.append(item)
+                if self._queue.empty():
+                    break
+                item = self._queue.get()
+            try:
+                self._file.write("".join(batch))
+                self._file.flush()
+            except BaseException:
+                self._logger.failure("Writing to the test log failed")
+            for event in flushed:
+                event.set()
+            if item is None:
+                return
@@ -9,17 +9,23 @@ responsible for coordinating all of trial's behavior at the highest level.
 @since: 12.3
 """
 
+import json
 import os
 import sys
+from collections import deque
 from functools import partial
+from importlib.util import find_spec
 from os.path import isabs
 from typing import (
     Awaitable,
     Callable,
+    Deque,
+    Dict,
     Iterable,
     List,
     Optional,
     Sequence,
+    Set,
     TextIO,
     Union,
     cast,
@@ -29,22 +35,36 @@ from unittest import TestCase, TestSuite
 from attrs import define, field, frozen
 from attrs.converters import default_if_none
 
-from twisted.internet.defer import Deferred, DeferredList, gatherResults
+from twisted.internet.defer import Deferred, DeferredList
 from twisted.internet.interfaces import IReactorCore, IReactorProcess
 from twisted.logger import Logger
 from twisted.python.failure import Failure
 from twisted.python.filepath import FilePath
 from twisted.python.lockfile import FilesystemLock
-from twisted.python.modules import theSystemPath
 from .._asyncrunner import _iterateTests
 from ..itrial import IReporter, ITestCase
 from ..reporter import UncleanWarningsReporterWrapper
 from ..runner import TestHolder
 from ..util import _unusedTestDirectory, openTestLog
 from . import _WORKER_AMP_STDIN, _WORKER_AMP_STDOUT
+from ._asynclog import AsyncLogWriter
 from .distreporter import DistReporter
-from .functional import countingCalls, discardResult, iterateWhile, takeWhile
-from .worker import LocalWorker, LocalWorkerAMP, WorkerAction
+from .worker import (
+    LocalWorker,
+    LocalWorkerAMP,
+    RunBatchResult,
+    TestLog,
+    WorkerAction,
+)
+
+# The script each worker process runs.
+_WORKERTRIAL_PATH = find_spec("twisted.trial._dist.workertrial").origin  # type: ignore[union-attr]
+
+# The suffix added to the name of the working directory to give the name of
+# the file which records how long each test took to run, by test id.  The file
+# is kept beside the working directory because the directory is emptied at
+# the start of every run.
+_RUNTIMES_SUFFIX = ".runtimes.json"
 
 
 class IDistTrialReactor(IReactorCore, IReactorProcess):
@@ -59,11 +79,8 @@ def _defaultReactor() -> IDistTrialReactor:
     """
     import twisted.internet.reactor as defaultReactor
 
-    if all(
-        [
-            IReactorCore.providedBy(defaultReactor),
-            IReactorProcess.providedBy(defaultReactor),
-        ]
+    if IReactorCore.providedBy(defaultReactor) and IReactorProcess.providedBy(
+        defaultReactor
     ):
         # If it provides each of the interfaces then it provides the
         # intersection interface.  cast it to make it easier to talk about
@@ -73,6 +90,20 @@ def _defaultReactor() -> IDistTrialReactor:
     raise TypeError("Reactor does not provide the right interfaces")
 
 
+def _defaultPipelineDepth() -> int:
+    """
+    Get the default number of tests to keep in flight to each worker.
+
+    This can be overridden by setting the C{TRIAL_DIST_PIPELINE} environment
+    variable to a positive integer.  Any other value is ignored.
+    """
+    try:
+        depth = int(os.environ.get("TRIAL_DIST_PIPELINE", "4"))
+    except ValueError:
+        return 4
+    return max(1, depth)
+
+
 @frozen
 class WorkerPoolConfig:
     """
@@ -106,7 +137,8 @@ class StartedWorkerPool:
     @ivar testDirLock: An object representing the cooperative lock this pool
         holds on its working directory.
 
-    @ivar testLog: The open overall test log file.
+    @ivar testLog: The open overall test log file.  Writes to it are
+        performed by a background thread and closing it waits for them.
 
     @ivar workers: Objects corresponding to the worker child processes and
         adapting between process-related interfaces and C{IProtocol}.
@@ -117,7 +149,7 @@ class StartedWorkerPool:
 
     workingDirectory: FilePath
     testDirLock: FilesystemLock
-    testLog: TextIO
+    testLog: TestLog
     workers: List[LocalWorker]
     ampWorkers: List[LocalWorkerAMP]
 
@@ -126,10 +158,21 @@ class StartedWorkerPool:
     async def run(self, workerAction: WorkerAction) -> None:
         """
         Run an action on all of the workers in the pool.
+
+        If the action fails for any of the workers, the first such failure is
+        raised once the action has finished on all of them.
         """
-        await gatherResults(
-            discardResult(workerAction(worker)) for worker in self.ampWorkers
+
+        async def runAction(worker: LocalWorkerAMP) -> None:
+            await workerAction(worker)
+
+        results = await DeferredList(
+            [Deferred.fromCoroutine(runAction(worker)) for worker in self.ampWorkers],
+            consumeErrors=True,
         )
+        for succeeded, failure in results:
+            if not succeeded:
+                failure.raiseException()
         return None
 
     async def join(self) -> None:
@@ -166,7 +209,7 @@ class WorkerPool:
         self,
         protocols: Iterable[LocalWorkerAMP],
         workingDirectory: FilePath,
-        logFile: TextIO,
+        logFile: TestLog,
     ) -> List[LocalWorker]:
         """
         Create local worker protocol instances and return them.
@@ -181,8 +224,11 @@ class WorkerPool:
 
         @return: A list of C{quantity} C{LocalWorker} instances.
         """
+        # The child names are always plain integers so there is no need for
+        # the validation FilePath.child performs on each of them.
+        parent = workingDirectory.asTextMode().path
         return [
-            LocalWorker(protocol, workingDirectory.child(str(x)), logFile)
+            LocalWorker(protocol, FilePath(os.path.join(parent, str(x))), logFile)
             for x, protocol in enumerate(protocols)
         ]
 
@@ -196,7 +242,6 @@ class WorkerPool:
 
         @param arguments: Extra arguments passed to the processes.
         """
-        workertrialPath = theSystemPath["twisted.trial._dist.workertrial"].filePath.path
         childFDs = {
             0: "w",
             1: "r",
@@ -204,13 +249,21 @@ class WorkerPool:
             _WORKER_AMP_STDIN: "w",
             _WORKER_AMP_STDOUT: "r",
         }
-        environ = os.environ.copy()
         # Add an environment variable containing the raw sys.path, to be used
         # by subprocesses to try to make it identical to the parent's.
-        environ["PYTHONPATH"] = os.pathsep.join(sys.path)
+        pythonPath = os.pathsep.join(sys.path)
+        if os.supports_bytes_environ:
+            # Pass the environment as bytes, the form the child process gets
+            # it in, so it is not encoded all over again for every worker.
+            environ = os.environb.copy()
+            environ[b"PYTHONPATH"] = os.fsencode(pythonPath)
+        else:
+            environ = os.environ.copy()
+            environ["PYTHONPATH"] = pythonPath
+        # Every worker gets the same command line.  spawnProcess does not
+        # modify the list so it is safe to share it.
+        args = [sys.executable, _WORKERTRIAL_PATH, *arguments]
         for worker in protocols:
-            args = [sys.executable, workertrialPath]
-            args.extend(arguments)
             spawner(worker, sys.executable, args=args, childFDs=childFDs, env=environ)
 
     async def start(self, reactor: IReactorProcess) -> StartedWorkerPool:
@@ -231,7 +284,9 @@ class WorkerPool:
             # the same as our configured working directory, if that path was
             # in use).
             testLogPath = testDir.preauthChild(self._config.logFile)
-        testLog = openTestLog(testLogPath)
+        # The log is written from a background thread so that workers with a
+        # lot of output do not block the reactor.
+        testLog = AsyncLogWriter(openTestLog(testLogPath))
 
         ampWorkers = [LocalWorkerAMP() for x in range(self._config.numWorkers)]
         workers = self._createLocalWorkers(
@@ -254,6 +309,41 @@ class WorkerPool:
         )
 
 
+def _readRuntimes(path: FilePath) -> Dict[str, float]:
+    """
+    Read the test runtimes recorded by an earlier run.
+
+    @param path: The file the runtimes were written to.
+
+    @return: The runtime of each test, in seconds, by test id.  This is empty
+        if there is no usable record.  Entries whose runtime is not a number
+        are left out.
+    """
+    try:
+        runtimes = json.loads(path.getContent())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(runtimes, dict):
+        return {}
+    return {
+        testId: runtime
+        for testId, runtime in runtimes.items()
+        if isinstance(runtime, (int, float)) and not isinstance(runtime, bool)
+    }
+
+
+def _writeRuntimes(path: FilePath, runtimes: Dict[str, float]) -> None:
+    """
+    Record test runtimes for the next run to use.
+
+    @param path: The file to write the runtimes to.
+
+    @param runtimes: The runtime of each test, in seconds, by test id.
+    """
+    path.parent().makedirs(ignoreExistingDirectory=True)
+    path.setContent(json.dumps(runtimes).encode("utf-8"))
+
+
 def shouldContinue(untilFailure: bool, result: IReporter) -> bool:
     """
     Determine whether the test suite should be iterated again.
@@ -269,10 +359,10 @@ def shouldContinue(untilFailure: bool, result: IReporter) -> bool:
 
 async def runTests(
     pool: StartedWorkerPool,
-    testCases: Iterable[ITestCase],
+    testCases: Deque[ITestCase],
     result: DistReporter,
     driveWorker: Callable[
-        [DistReporter, Sequence[ITestCase], LocalWorkerAMP], Awaitable[None]
+        [DistReporter, Deque[ITestCase], LocalWorkerAMP], Awaitable[None]
     ],
 ) -> None:
     try:
@@ -300,6 +390,14 @@ class DistTrialRunner:
     @ivar stream: stream which the reporter will use.
 
     @ivar _reporterFactory: the reporter class to be used.
+
+    @ivar _pipelineDepth: The maximum number of requests which will be sent
+        to a single worker before it has reported the result of the earliest
+        one.  Keeping more than one request in flight hides the latency of the
+        round trip between the manager and the worker.
+
+    @ivar _batchSize: The maximum number of tests sent to a worker in a single
+        request.
     """
 
     _distReporterFactory = DistReporter
@@ -325,6 +423,8 @@ class DistTrialRunner:
     _logfile: str = "test.log"
     _workingDirectory: str = "_trial_temp"
     _workerPoolFactory: Callable[[WorkerPoolConfig], WorkerPool] = WorkerPool
+    _pipelineDepth: int = field(factory=_defaultPipelineDepth)
+    _batchSize: int = 8
 
     def _makeResult(self) -> DistReporter:
         """
@@ -348,31 +448,82 @@ class DistTrialRunner:
     async def _driveWorker(
         self,
         result: DistReporter,
-        testCases: Sequence[ITestCase],
+        testCases: Deque[ITestCase],
         worker: LocalWorkerAMP,
+        runtimes: Dict[str, float],
     ) -> None:
         """
-        Drive a L{LocalWorkerAMP} instance, iterating the tests and calling
-        C{run} for every one of them.
+        Drive a L{LocalWorkerAMP} instance, taking batches of tests from the
+        front of the shared queue and calling C{runBatch} for every one of
+        them.  Up to C{self._pipelineDepth} batches are given to the worker
+        before waiting for any of them to complete, except in C{exitFirst}
+        mode where the worker runs one test at a time.
 
         @param worker: The L{LocalWorkerAMP} to drive.
 
         @param result: The global L{DistReporter} instance.
 
-        @param testCases: The global list of tests to iterate.
+        @param testCases: The queue of tests still to be run, shared by all of
+            the workers.  Each worker removes the tests it takes from it.
+
+        @param runtimes: A mapping from test id to runtime, in seconds, to
+            update with the time each test took, as measured by the worker.
 
         @return: A coroutine that completes after all of the tests have
             completed.
         """
 
-        async def task(case):
-            try:
-                await worker.run(case, result)
-            except Exception:
-                result.original.addError(case, Failure())
-
-        for case in testCases:
-            await task(case)
+        def runFailed(failure: Failure, cases: List[TestCase]) -> None:
+            # Exceptions from the test itself are reported by the worker.  A
+            # failure here means the worker could not run the tests at all.
+            failure.trap(Exception)
+            for case in cases:
+                result.original.addError(case, failure)
+
+        def recordRuntimes(outcome: RunBatchResult, cases: List[TestCase]) -> None:
+            # The worker times each test itself.  There are no durations if it
+            # could not run the tests.
+            for case, duration in zip(cases, outcome.get("durations", [])):
+                runtimes[case.id()] = duration
+
+        if self._exitFirst:
+            # Results from tests in flight at the same time can arrive in any
+            # order.  A failure takes more round trips to report than a
+            # success does so the tests after it could all be reported
+            # before the failure is seen, so only run one test at a time.
+            pipelineDepth = 1
+        else:
+            pipelineDepth = self._pipelineDepth
+
+        pending: Set[Deferred[object]] = set()
+        while testCases:
+            if self._exitFirst and not result.original.wasSuccessful():
+                # Stop giving out tests as soon as the result object has seen
+                # something other than success.
+                break
+            if self._exitFirst:
+                # Don't commit to more than one test at a time so the run can
+                # stop promptly.  See below for the pipeline depth.
+                batchSize = 1
+            else:
+                # Take smaller batches as the queue drains so that the last
+                # tests are spread over all of the workers instead of being
+                # queued up behind one of them.
+                share = len(testCases) // (self._maxWorkers * pipelineDepth)
+                batchSize = max(1, min(self._batchSize, share))
+            # The tests come from _iterateTests, which only produces pyunit
+            # test cases.
+            batch = [cast(TestCase, testCases.popleft()) for n in range(batchSize)]
+            running = Deferred.fromCoroutine(worker.runBatch(batch, result))
+            running.addCallback(recordRuntimes, batch)
+            running.addErrback(runFailed, batch)
+            if not running.called:
+                pending.add(running)
+                running.addBoth(lambda ignored, d=running: pending.discard(d))
+            if len(pending) >= pipelineDepth:
+                # Wait for a slot to free up before taking more tests.
+                await DeferredList(list(pending), fireOnOneCallback=True)
+        await DeferredList(list(pending))
 
     async def runAsync(
         self,
@@ -390,14 +541,15 @@ class DistTrialRunner:
         @return: A coroutine that completes with the test result.
         """
 
-        # Realize a concrete set of tests to run.
-        testCases = list(_iterateTests(suite))
+        # Count the cases to run without holding on to them.  The suite is
+        # enumerated again once the worker pool is starting up.
+        caseCount = sum(1 for _ in _iterateTests(suite))
 
-        # Create a worker pool to use to execute them.
+        # Create a worker pool to use to execute the tests.
         poolStarter = self._workerPoolFactory(
             WorkerPoolConfig(
                 # Don't make it larger than is useful or allowed.
-                min(len(testCases), self._maxWorkers),
+                min(caseCount, self._maxWorkers),
                 FilePath(self._workingDirectory),
                 self._workerArguments,
                 self._logfile,
@@ -405,18 +557,21 @@ class DistTrialRunner:
         )
 
         # Announce that we're beginning.  countTestCases result is preferred
-        # (over len(testCases)) because testCases may contain synthetic cases
-        # for error reporting purposes.
+        # (over caseCount) because the cases may include synthetic cases for
+        # error reporting purposes.
         self.stream.write(f"Running {suite.countTestCases()} tests.\n")
 
-        # Start the worker pool.
-        startedPool = await poolStarter.start(self._reactor)
+        workingDirectory = FilePath(self._workingDirectory)
+        runtimesPath = workingDirectory.sibling(
+            workingDirectory.basename() + _RUNTIMES_SUFFIX
+        )
+        runtimes = _readRuntimes(runtimesPath)
 
-        # The condition that will determine whether the test run repeats.
-        condition = partial(shouldContinue, untilFailure)
+        # Start the worker pool.  The worker processes start up in the
+        # background while the suite is enumerated below.
+        startedPool = await poolStarter.start(self._reactor)
 
         # A function that will run the whole suite once.
-        @countingCalls
         async def runAndReport(n: int) -> DistReporter:
             if untilFailure:
                 # If and only if we're running the suite more than once,
@@ -425,27 +580,50 @@ class DistTrialRunner:
 
             result = self._makeResult()
 
-            if self._exitFirst:
-                # Keep giving out tests as long as the result object has only
-                # seen success.
-                casesCondition = lambda _: result.original.wasSuccessful()
-            else:
-                casesCondition = lambda _: True
-
             await runTests(
                 startedPool,
-                takeWhile(casesCondition, testCases),
+                deque(testCases),
                 result,
-                self._driveWorker,
+                partial(self._driveWorker, runtimes=runtimes),
             )
             self.writeResults(result)
             return result
 
         try:
+            # Realize a concrete set of tests to run.
+            testCases = list(_iterateTests(suite))
+            if runtimes:
+                # Hand out the slowest tests first so that no worker is left
+                # running a long test while the others have nothing to do.
+                testCases.sort(
+                    key=lambda case: runtimes.get(case.id(), 0), reverse=True
+                )
+
             # Start submitting tests to workers in the pool.  Perhaps repeat
             # the whole test suite more than once, if appropriate for our
             # configuration.
-            return await iterateWhile(condition, runAndReport)
+            n = 0
+            while True:
+                result = await runAndReport(n)
+                n += 1
+                if not shouldContinue(untilFailure, result):
+                    break
+
+            # Only keep the runtimes of tests which are still in the suite so
+            # that the record does not grow as tests are renamed or removed.
+            testIds = {case.id() for case in testCases}
+            try:
+                _writeRuntimes(
+                    runtimesPath,
+                    {
+                        testId: runtime
+                        for testId, runtime in runtimes.items()
+                        if testId in testIds
+                    },
+                )
+            except OSError:
+                self._logger.failure("Could not record test runtimes")
+            return result
         finally:
             # Shut down the worker pool.
             await startedPool.join()
@@ -0,0 +1,145 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.trial._dist._asynclog}.
+"""
+
+from io import StringIO
+from typing import Callable, List
+
+from hamcrest import assert_that, calling, equal_to, has_length, raises
+
+from twisted.python.filepath import FilePath
+from twisted.trial.unittest import SynchronousTestCase
+from ...util import openTestLog
+from .. import _asynclog
+from .._asynclog import AsyncLogWriter
+
+
+class WriteFailed(Exception):
+    """
+    Writing to a file failed.
+    """
+
+
+class BrokenFile(StringIO):
+    """
+    A file which can never be written to.
+    """
+
+    name = "<broken>"
+
+    def write(self, data: str) -> int:
+        raise WriteFailed()
+
+
+class FakeAtexit:
+    """
+    A stand-in for the L{atexit} module which records the registered exit
+    handlers instead of running them at exit.
+    """
+
+    def __init__(self) -> None:
+        self.handlers: List[Callable[[], object]] = []
+
+    def register(self, handler: Callable[[], object]) -> None:
+        self.handlers.append(handler)
+
+    def unregister(self, handler: Callable[[], object]) -> None:
+        self.handlers.remove(handler)
+
+
+class AsyncLogWriterTests(SynchronousTestCase):
+    """
+    Tests for L{AsyncLogWriter}.
+    """
+
+    def setUp(self) -> None:
+        self.path = FilePath(self.mktemp())
+        self.writer = AsyncLogWriter(openTestLog(self.path))
+        self.addCleanup(self.writer.close)
+
+    def test_write(self) -> None:
+        """
+        Everything written to an L{AsyncLogWriter} is in the underlying file,
+        in order, after the writer is closed.
+        """
+        expected = "".join(f"line {n}\n" for n in range(1000))
+        for line in StringIO(expected):
+            assert_that(self.writer.write(line), equal_to(len(line)))
+            self.writer.flush()
+        self.writer.close()
+        assert_that(self.path.getContent().decode("utf-8"), equal_to(expected))
+
+    def test_close(self) -> None:
+        """
+        L{AsyncLogWriter.close} closes the underlying file and can be called
+        more than once.
+        """
+        assert_that(self.writer.closed, equal_to(False))
+        self.writer.close()
+        assert_that(self.writer.closed, equal_to(True))
+        self.writer.close()
+        assert_that(self.writer.closed, equal_to(True))
+
+    def test_writeAfterClose(self) -> None:
+        """
+        L{AsyncLogWriter.write} raises L{ValueError} once the writer has been
+        closed.
+        """
+        self.writer.close()
+        assert_that(calling(self.writer.write).with_args("x"), raises(ValueError))
+
+    def test_name(self) -> None:
+        """
+        L{AsyncLogWriter.name} is the name of the underlying file.
+        """
+        assert_that(self.writer.name, equal_to(self.path.path))
+
+    def test_flush(self) -> None:
+        """
+        Everything written to an L{AsyncLogWriter} is in the underlying file
+        once L{AsyncLogWriter.flush} returns.
+        """
+        self.writer.write("some ")
+        self.writer.write("text\n")
+        self.writer.flush()
+        assert_that(self.path.getContent().decode("utf-8"), equal_to("some text\n"))
+
+    def test_flushAfterClose(self) -> None:
+        """
+        L{AsyncLogWriter.flush} raises L{ValueError} once the writer has been
+        closed.
+        """
+        self.writer.close()
+        assert_that(calling(self.writer.flush).with_args(), raises(ValueError))
+
+    def test_writeFailed(self) -> None:
+        """
+        If writing to the underlying file fails, the failure is logged and the
+        writer keeps accepting text.
+        """
+        writer = AsyncLogWriter(BrokenFile())
+        self.addCleanup(writer.close)
+        writer.write("text\n")
+        writer.flush()
+        assert_that(self.flushLoggedErrors(WriteFailed), has_length(1))
+        writer.write("more text\n")
+        writer.close()
+        assert_that(self.flushLoggedErrors(WriteFailed), has_length(1))
+
+    def test_closedAtExit(self) -> None:
+        """
+        An L{AsyncLogWriter} which has not been closed when the process exits
+        is closed then, so that the text written to it is not lost.
+        """
+        fakeAtexit = FakeAtexit()
+        self.patch(_asynclog, "atexit", fakeAtexit)
+        writer = AsyncLogWriter(openTestLog(FilePath(self.mktemp())))
+        self.addCleanup(writer.close)
+        [handler] = fakeAtexit.handlers
+        writer.write("text\n")
+        handler()
+        assert_that(writer.closed, equal_to(True))
+        assert_that(fakeAtexit.handlers, equal_to([]))
@@ -5,12 +5,14 @@
 Tests for L{twisted.trial._dist.disttrial}.
 """
 
+import json
 import os
 import sys
 from functools import partial
 from io import StringIO
 from os.path import sep
-from typing import Callable, List, Set
+from time import perf_counter
+from typing import Callable, Dict, List, Sequence, Set, Tuple
 from unittest import TestCase as PyUnitTestCase
 
 from zope.interface import implementer, verify
@@ -42,14 +44,14 @@ from twisted.python.lockfile import FilesystemLock
 from twisted.trial._dist import _WORKER_AMP_STDIN
 from twisted.trial._dist.distreporter import DistReporter
 from twisted.trial._dist.disttrial import DistTrialRunner, WorkerPool, WorkerPoolConfig
-from twisted.trial._dist.functional import (
-    countingCalls,
-    discardResult,
-    fromOptional,
-    iterateWhile,
-    sequence,
+from twisted.trial._dist.functional import fromOptional
+from twisted.trial._dist.worker import (
+    LocalWorker,
+    RunBatchResult,
+    RunResult,
+    Worker,
+    WorkerAction,
 )
-from twisted.trial._dist.worker import LocalWorker, RunResult, Worker, WorkerAction
 from twisted.trial.reporter import (
     Reporter,
     TestResult,
@@ -224,13 +226,17 @@ class WorkerPoolTests(TestCase):
     def test_createLocalWorkers(self):
         """
         C{_createLocalWorkers} iterates the list of protocols and create one
-        L{LocalWorker} for each.
+        L{LocalWorker} for each, each with its own numbered directory.
         """
         protocols = [object() for x in range(4)]
         workers = self.pool._createLocalWorkers(protocols, FilePath("path"), StringIO())
         for s in workers:
             self.assertIsInstance(s, LocalWorker)
         self.assertEqual(4, len(workers))
+        self.assertEqual(
+            [FilePath("path").child(str(x)) for x in range(4)],
+            [w._logDirectory for w in workers],
+        )
 
     def test_launchWorkerProcesses(self):
         """
@@ -262,8 +268,13 @@ class WorkerPoolTests(TestCase):
         self.assertEqual("foo", arguments[3])
         # The child process runs with PYTHONPATH set to exactly the parent's
         # import search path so that the child has a good chance of finding
-        # the same source files the parent would have found.
-        self.assertEqual(os.pathsep.join(sys.path), environment["PYTHONPATH"])
+        # the same source files the parent would have found.  Where the
+        # platform allows it, the environment is given in bytes.
+        if os.supports_bytes_environ:
+            pythonPath = os.fsdecode(environment[b"PYTHONPATH"])
+        else:
+            pythonPath = environment["PYTHONPATH"]
+        self.assertEqual(os.pathsep.join(sys.path), pythonPath)
 
     def test_run(self):
         """
@@ -280,6 +291,31 @@ class WorkerPoolTests(TestCase):
         self.successResultOf(running)
         assert_that(workers, has_length(self.config.numWorkers))
 
+    def test_runFailure(self) -> None:
+        """
+        If the action fails for any worker, C{run} waits for the action to
+        finish on every worker and then fails with that exception.
+        """
+        self.parent.makedirs()
+
+        class Broken(Exception):
+            pass
+
+        waiting: List[Deferred[None]] = []
+
+        async def action(worker: Worker) -> None:
+            if waiting:
+                raise Broken()
+            d: Deferred[None] = Deferred()
+            waiting.append(d)
+            await d
+
+        started = self.successResultOf(self.pool.start(CountingReactor([])))
+        running = Deferred.fromCoroutine(started.run(action))
+        self.assertNoResult(running)
+        waiting[0].callback(None)
+        self.failureResultOf(running, Broken)
+
     def test_runUsedDirectory(self):
         """
         L{WorkerPool.start} checks if the test directory is already locked, and if
@@ -416,6 +452,43 @@ class DistTrialRunnerTests(TestCase):
         self.successResultOf(runner.runAsync(suite))
         assert_that(pool._started[0].workers, has_length(numTests))
 
+    def test_minimalWorkerWithErrors(self) -> None:
+        """
+        L{DistTrialRunner.runAsync} counts the error holders in the suite as
+        well as the tests when deciding how many workers to start.
+        """
+        pools: List[LocalWorkerPool] = []
+
+        def recordingFactory(*a, **kw):
+            pools.append(LocalWorkerPool(*a, autostop=True, **kw))
+            return pools[-1]
+
+        runner = self.getRunner(maxWorkers=7, workerPoolFactory=recordingFactory)
+        suite = TrialSuite(
+            [
+                TestCase(),
+                ErrorHolder("an error", Failure(RuntimeError("foo bar"))),
+                ErrorHolder("another error", Failure(RuntimeError("baz quux"))),
+            ]
+        )
+        self.successResultOf(runner.runAsync(suite))
+        assert_that(pools[0]._started[0].workers, has_length(3))
+
+    def test_noWorkersWithoutTests(self) -> None:
+        """
+        L{DistTrialRunner.runAsync} does not start any workers for an empty
+        suite.
+        """
+        pools: List[LocalWorkerPool] = []
+
+        def recordingFactory(*a, **kw):
+            pools.append(LocalWorkerPool(*a, autostop=True, **kw))
+            return pools[-1]
+
+        runner = self.getRunner(workerPoolFactory=recordingFactory)
+        self.successResultOf(runner.runAsync(TrialSuite()))
+        assert_that(pools[0]._started[0].workers, has_length(0))
+
     def test_runUncleanWarnings(self) -> None:
         """
         Running with the C{unclean-warnings} option makes L{DistTrialRunner} uses
@@ -518,6 +591,219 @@ class DistTrialRunnerTests(TestCase):
         result = self.successResultOf(d)
         self.assertIsInstance(result, DistReporter)
 
+    def test_pipelining(self) -> None:
+        """
+        L{DistTrialRunner} gives a worker up to C{pipelineDepth} tests before
+        waiting for any of them to complete.
+        """
+        worker = _PendingLocalWorker()
+        runner = self.getRunner(
+            maxWorkers=1,
+            pipelineDepth=2,
+            workerPoolFactory=partial(
+                LocalWorkerPool, workerFactory=lambda: worker, autostop=True
+            ),
+        )
+        suite = TrialSuite(
+            [
+                sample.AlphabetTest("test_a"),
+                sample.AlphabetTest("test_b"),
+                sample.AlphabetTest("test_c"),
+            ]
+        )
+        d = Deferred.fromCoroutine(runner.runAsync(suite))
+        assert_that(worker.running, has_length(2))
+        worker.finishOne()
+        assert_that(worker.running, has_length(2))
+        worker.finishOne()
+        assert_that(worker.running, has_length(1))
+        self.assertNoResult(d)
+        worker.finishOne()
+        result = self.successResultOf(d)
+        assert_that(result.original, matches_result(successes=equal_to(3)))
+
+    def test_pipelineDepthFromEnvironment(self) -> None:
+        """
+        By default L{DistTrialRunner} takes its pipeline depth from the
+        C{TRIAL_DIST_PIPELINE} environment variable.
+        """
+        self.patch(os, "environ", {"TRIAL_DIST_PIPELINE": "7"})
+        assert_that(self.getRunner()._pipelineDepth, equal_to(7))
+
+    def test_pipelineDepthInvalid(self) -> None:
+        """
+        If C{TRIAL_DIST_PIPELINE} is not an integer, L{DistTrialRunner} uses
+        its usual pipeline depth instead.
+        """
+        self.patch(os, "environ", {"TRIAL_DIST_PIPELINE": "deep"})
+        assert_that(self.getRunner()._pipelineDepth, equal_to(4))
+
+    def test_batches(self) -> None:
+        """
+        L{DistTrialRunner} gives a worker up to C{batchSize} tests in a single
+        request, and smaller batches as the remaining tests run out.
+        """
+        worker = _PendingLocalWorker()
+        runner = self.getRunner(
+            maxWorkers=1,
+            pipelineDepth=1,
+            batchSize=8,
+            workerPoolFactory=partial(
+                LocalWorkerPool, workerFactory=lambda: worker, autostop=True
+            ),
+        )
+        suite = TrialSuite([sample.FooTest("test_foo") for n in range(20)])
+        d = Deferred.fromCoroutine(runner.runAsync(suite))
+        sizes = []
+        while worker.running:
+            [(cases, _result, waiting)] = worker.running
+            sizes.append(len(cases))
+            worker.finishOne()
+        assert_that(sizes, equal_to([8, 8, 4]))
+        result = self.successResultOf(d)
+        assert_that(result.original, matches_result(successes=equal_to(20)))
+
+    def test_slowestFirst(self) -> None:
+        """
+        L{DistTrialRunner} hands out the tests which took the longest on the
+        previous run first.  The runtimes are read from a file beside the
+        working directory.
+        """
+        workingDirectory = FilePath(self.mktemp())
+        workingDirectory.sibling(
+            workingDirectory.basename() + ".runtimes.json"
+        ).setContent(
+            json.dumps(
+                {
+                    sample.AlphabetTest("test_a").id(): 1.0,
+                    sample.AlphabetTest("test_b").id(): 3.0,
+                    sample.AlphabetTest("test_c").id(): 2.0,
+                }
+            ).encode("utf-8")
+        )
+        worker = _PendingLocalWorker()
+        runner = self.getRunner(
+            maxWorkers=1,
+            pipelineDepth=1,
+            batchSize=1,
+            workingDirectory=workingDirectory.path,
+            workerPoolFactory=partial(
+                LocalWorkerPool, workerFactory=lambda: worker, autostop=True
+            ),
+        )
+        suite = TrialSuite(
+            [
+                sample.AlphabetTest("test_a"),
+                sample.AlphabetTest("test_b"),
+                sample.AlphabetTest("test_c"),
+            ]
+        )
+        d = Deferred.fromCoroutine(runner.runAsync(suite))
+        order: List[str] = []
+        while worker.running:
+            [(cases, result, waiting)] = worker.running
+            order.extend(case.id().rsplit(".", 1)[-1] for case in cases)
+            worker.finishOne()
+        self.successResultOf(d)
+        assert_that(order, equal_to(["test_b", "test_c", "test_a"]))
+
+    def test_unusableRuntimes(self) -> None:
+        """
+        L{DistTrialRunner} ignores recorded runtimes which are not numbers.
+        """
+        workingDirectory = FilePath(self.mktemp())
+        workingDirectory.sibling(
+            workingDirectory.basename() + ".runtimes.json"
+        ).setContent(
+            json.dumps(
+                {
+                    sample.AlphabetTest("test_a").id(): "slow",
+                    sample.AlphabetTest("test_b").id(): None,
+                    sample.AlphabetTest("test_c").id(): 1.0,
+                }
+            ).encode("utf-8")
+        )
+        worker = _PendingLocalWorker()
+        runner = self.getRunner(
+            maxWorkers=1,
+            pipelineDepth=1,
+            batchSize=1,
+            workingDirectory=workingDirectory.path,
+            workerPoolFactory=partial(
+                LocalWorkerPool, workerFactory=lambda: worker, autostop=True
+            ),
+        )
+        suite = TrialSuite(
+            [
+                sample.AlphabetTest("test_a"),
+                sample.AlphabetTest("test_b"),
+                sample.AlphabetTest("test_c"),
+            ]
+        )
+        d = Deferred.fromCoroutine(runner.runAsync(suite))
+        order: List[str] = []
+        while worker.running:
+            [(cases, _result, waiting)] = worker.running
+            order.extend(case.id().rsplit(".", 1)[-1] for case in cases)
+            worker.finishOne()
+        result = self.successResultOf(d)
+        assert_that(order, equal_to(["test_c", "test_a", "test_b"]))
+        assert_that(result.original, matches_result(successes=equal_to(3)))
+
+    def test_recordRuntimes(self) -> None:
+        """
+        L{DistTrialRunner} records how long the worker reported each test took
+        in a file beside the working directory.
+        """
+        workingDirectory = FilePath(self.mktemp())
+        cases = [sample.AlphabetTest("test_a"), sample.AlphabetTest("test_b")]
+        durations = {cases[0].id(): 0.5, cases[1].id(): 2.0}
+        runner = self.getRunner(
+            workingDirectory=workingDirectory.path,
+            workerPoolFactory=partial(
+                LocalWorkerPool,
+                workerFactory=lambda: _TimedLocalWorker(durations),
+                autostop=True,
+            ),
+        )
+        self.successResultOf(runner.runAsync(TrialSuite(cases)))
+        runtimes = json.loads(
+            workingDirectory.sibling(
+                workingDirectory.basename() + ".runtimes.json"
+            ).getContent()
+        )
+        assert_that(runtimes, equal_to(durations))
+
+    def test_forgetRuntimes(self) -> None:
+        """
+        L{DistTrialRunner} does not keep the recorded runtimes of tests which
+        are not in the suite it runs.
+        """
+        workingDirectory = FilePath(self.mktemp())
+        runtimesPath = workingDirectory.sibling(
+            workingDirectory.basename() + ".runtimes.json"
+        )
+        runtimesPath.setContent(
+            json.dumps(
+                {
+                    sample.AlphabetTest("test_a").id(): 1.0,
+                    "removed.test": 3.0,
+                }
+            ).encode("utf-8")
+        )
+        cases = [sample.AlphabetTest("test_a"), sample.AlphabetTest("test_b")]
+        durations = {cases[0].id(): 0.5, cases[1].id(): 2.0}
+        runner = self.getRunner(
+            workingDirectory=workingDirectory.path,
+            workerPoolFactory=partial(
+                LocalWorkerPool,
+                workerFactory=lambda: _TimedLocalWorker(durations),
+                autostop=True,
+            ),
+        )
+        self.successResultOf(runner.runAsync(TrialSuite(cases)))
+        assert_that(json.loads(runtimesPath.getContent()), equal_to(durations))
+
     def test_exitFirst(self):
         """
         L{DistTrialRunner} can run in C{exitFirst} mode where it will run until a
@@ -543,6 +829,39 @@ class DistTrialRunnerTests(TestCase):
             ),
         )
 
+    def test_exitFirstOutOfOrder(self) -> None:
+        """
+        In C{exitFirst} mode L{DistTrialRunner} only gives a worker one test at
+        a time so that no test after a failing one runs, even if the worker
+        would report results for the tests given to it out of order.
+        """
+        worker = _PendingLocalWorker()
+        runner = self.getRunner(
+            exitFirst=True,
+            maxWorkers=1,
+            pipelineDepth=4,
+            workerPoolFactory=partial(
+                LocalWorkerPool, workerFactory=lambda: worker, autostop=True
+            ),
+        )
+        suite = TrialSuite(
+            [
+                erroneous.TestRegularFail("test_fail"),
+                sample.FooTest("test_foo"),
+                sample.FooTest("test_bar"),
+            ]
+        )
+        d = Deferred.fromCoroutine(runner.runAsync(suite))
+        while worker.running:
+            assert_that(worker.running, has_length(1))
+            # Finish the most recently submitted batch first.
+            worker.finishOne(-1)
+        result = self.successResultOf(d)
+        assert_that(
+            result.original,
+            matches_result(successes=equal_to(0), failures=has_length(1)),
+        )
+
     def test_runUntilFailure(self):
         """
         L{DistTrialRunner} can run in C{untilFailure} mode where it will run
@@ -681,69 +1000,6 @@ class FunctionalTests(TestCase):
         assert_that(fromOptional(1, None), equal_to(1))
         assert_that(fromOptional(2, 2), equal_to(2))
 
-    def test_discardResult(self) -> None:
-        """
-        ``discardResult`` accepts an awaitable and returns a ``Deferred`` that
-        fires with ``None`` after the awaitable completes.
-        """
-        a: Deferred[str] = Deferred()
-        d = discardResult(a)
-        self.assertNoResult(d)
-        a.callback("result")
-        assert_that(self.successResultOf(d), none())
-
-    def test_sequence(self):
-        """
-        ``sequence`` accepts two awaitables and returns an awaitable that waits
-        for the first one to complete and then completes with the result of
-        the second one.
-        """
-        a: Deferred[str] = Deferred()
-        b: Deferred[int] = Deferred()
-        c = Deferred.fromCoroutine(sequence(a, b))
-        b.callback(42)
-        self.assertNoResult(c)
-        a.callback("hello")
-        assert_that(self.successResultOf(c), equal_to(42))
-
-    def test_iterateWhile(self):
-        """
-        ``iterateWhile`` executes the actions from its factory until the predicate
-        does not match an action result.
-        """
-        actions: List[Deferred[int]] = [Deferred(), Deferred(), Deferred()]
-
-        def predicate(value):
-            return value != 42
-
-        d: Deferred[int] = Deferred.fromCoroutine(
-            iterateWhile(predicate, list(actions).pop)
-        )
-        # Let the action it is waiting on complete
-        actions.pop().callback(7)
-
-        # It does not match the predicate so it is not done yet.
-        self.assertNoResult(d)
-
-        # Let the action it is waiting on now complete - with the result it
-        # wants.
-        actions.pop().callback(42)
-
-        assert_that(self.successResultOf(d), equal_to(42))
-
-    def test_countingCalls(self):
-        """
-        ``countingCalls`` decorates a function so that it is called with an
-        increasing counter and passes the return value through.
-        """
-
-        @countingCalls
-        def target(n: int) -> int:
-            return n + 1
-
-        for expected in range(1, 10):
-            assert_that(target(), equal_to(expected))
-
 
 class WorkerPoolBroken(Exception):
     """
@@ -795,6 +1051,45 @@ class _LocalWorker:
         TrialSuite([case]).run(result)
         return {"success": True}
 
+    async def runBatch(
+        self, cases: Sequence[PyUnitTestCase], result: TestResult
+    ) -> RunBatchResult:
+        """
+        Directly run all of C{cases} in the usual way, one at a time, timing
+        each of them.
+        """
+        durations = []
+        for case in cases:
+            started = perf_counter()
+            TrialSuite([case]).run(result)
+            durations.append(perf_counter() - started)
+        return {"success": True, "durations": durations}
+
+
+@define
+class _TimedLocalWorker(_LocalWorker):
+    """
+    A L{Worker} that runs tests in this process in the usual way but reports
+    made up durations for them.
+
+    @ivar durations: The duration to report for each test, by test id.
+    """
+
+    durations: Dict[str, float]
+
+    async def runBatch(
+        self, cases: Sequence[PyUnitTestCase], result: TestResult
+    ) -> RunBatchResult:
+        """
+        Directly run all of C{cases} in the usual way and report the
+        durations given for them in C{durations}.
+        """
+        await super().runBatch(cases, result)
+        return {
+            "success": True,
+            "durations": [self.durations[case.id()] for case in cases],
+        }
+
 
 class WorkerBroken(Exception):
     """
@@ -813,6 +1108,58 @@ class _BrokenLocalWorker:
         """
         raise WorkerBroken()
 
+    async def runBatch(
+        self, cases: Sequence[PyUnitTestCase], result: TestResult
+    ) -> None:
+        """
+        Raise an exception instead of running C{cases}.
+        """
+        raise WorkerBroken()
+
+
+@define
+class _PendingLocalWorker:
+    """
+    A L{Worker} that runs tests in this process but only when told to,
+    allowing the number of outstanding requests to be observed.
+
+    @ivar running: The batches of tests which have been given to this worker
+        and not yet run, along with the result to report to and a
+        L{Deferred} which allows the tests to run when it fires.
+    """
+
+    running: List[Tuple[Sequence[PyUnitTestCase], TestResult, Deferred[None]]] = field(
+        default=Factory(list)
+    )
+
+    async def run(self, case: PyUnitTestCase, result: TestResult) -> RunResult:
+        """
+        Wait until L{finishOne} is called and then directly run C{case}.
+        """
+        return await self.runBatch([case], result)
+
+    async def runBatch(
+        self, cases: Sequence[PyUnitTestCase], result: TestResult
+    ) -> RunBatchResult:
+        """
+        Wait until L{finishOne} is called and then directly run C{cases}.
+        """
+        waiting: Deferred[None] = Deferred()
+        self.running.append((cases, result, waiting))
+        await waiting
+        TrialSuite(list(cases)).run(result)
+        return {"success": True}
+
+    def finishOne(self, index: int = 0) -> None:
+        """
+        Run one of the batches of tests which are still outstanding.
+
+        @param index: The position of the batch in C{running}.  By default
+            the earliest batch is run.
+        """
+        cases, result, waiting = self.running.pop(index)
+        waiting.callback(None)
+
 
 @define
 class StartedLocalWorkerPool:
@@ -12,7 +12,14 @@ from unittest import TestCase as PyUnitTestCase
 
 from zope.interface.verify import verifyObject
 
-from hamcrest import assert_that, equal_to, has_item, has_length
+from hamcrest import (
+    assert_that,
+    equal_to,
+    greater_than_or_equal_to,
+    has_item,
+    has_length,
+    only_contains,
+)
 
 from twisted.internet.defer import Deferred, fail
 from twisted.internet.error import ConnectionLost, ProcessDone
@@ -63,6 +70,30 @@ class WorkerProtocolTests(TestCase):
         self.flush()
         self.assertEqual({"success": True}, self.successResultOf(d))
 
+    def test_runBatch(self) -> None:
+        """
+        Sending the L{workercommands.RunBatch} command to the worker runs all
+        of the given tests and returns a response with C{success} set to
+        C{True} and a duration for each of the tests.
+        """
+        cases = [
+            pyunitcases.PyUnitTest("test_pass"),
+            pyunitcases.PyUnitTest("test_skip"),
+        ]
+        result = TestResult()
+        d = Deferred.fromCoroutine(self.server.runBatch(cases, result))
+        self.flush()
+        response = self.successResultOf(d)
+        assert_that(response["success"], equal_to(True))
+        assert_that(response["durations"], has_length(2))
+        assert_that(response["durations"], only_contains(greater_than_or_equal_to(0)))
+        assert_that(
+            result,
+            matches_result(successes=equal_to(1), skips=has_length(1)),
+        )
+        [(actualCase, reason)] = result.skips
+        assert_that(actualCase, equal_to(cases[1]))
+
     def test_start(self) -> None:
         """
         The C{start} command changes the current path.
@@ -268,6 +299,115 @@ class LocalWorkerAMPTests(TestCase):
         assert_that(expectedCase, equal_to(actualCase))
         assert_that(unexpectedSuccess, equal_to("todo7"))
 
+    def test_runConcurrently(self) -> None:
+        """
+        Several tests can be running at once and the results reported for each
+        of them are matched up with the right test case.
+        """
+        passCase = pyunitcases.PyUnitTest("test_pass")
+        failCase = pyunitcases.PyUnitTest("test_fail")
+        result = TestResult()
+        running = [
+            Deferred.fromCoroutine(self.managerAMP.run(case, result))
+            for case in [passCase, failCase]
+        ]
+        self.flush()
+        for d in running:
+            self.assertEqual({"success": True}, self.successResultOf(d))
+        assert_that(
+            result,
+            matches_result(successes=equal_to(1), failures=has_length(1)),
+        )
+        [(actualCase, failure)] = result.failures
+        assert_that(actualCase, equal_to(failCase))
+
+    def test_runLostAfterOutcome(self) -> None:
+        """
+        If the connection to the worker is lost after it reported the outcome
+        of a test but before the C{Run} command completed,
+        L{LocalWorkerAMP.run} reports nothing else for the test.
+        """
+        case = pyunitcases.PyUnitTest("test_pass")
+        result = TestResult()
+        d = Deferred.fromCoroutine(self.managerAMP.run(case, result))
+        self.managerAMP.addSuccess(case.id())
+        self.managerAMP.connectionLost(Failure(ConnectionLost()))
+        self.assertEqual({"success": False}, self.successResultOf(d))
+        assert_that(result, matches_result(successes=equal_to(1)))
+
+    def test_runLostBeforeOutcome(self) -> None:
+        """
+        If the connection to the worker is lost before it reported the outcome
+        of a test, L{LocalWorkerAMP.run} reports the reason as an error for the
+        test.
+        """
+        case = pyunitcases.PyUnitTest("test_pass")
+        result = TestResult()
+        d = Deferred.fromCoroutine(self.managerAMP.run(case, result))
+        self.managerAMP.connectionLost(Failure(ConnectionLost()))
+        self.assertEqual({"success": False}, self.successResultOf(d))
+        assert_that(result, matches_result(errors=has_length(1)))
+        [(actualCase, failure)] = result.errors
+        assert_that(actualCase, equal_to(case))
+        assert_that(failure, isFailure(type=equal_to(ConnectionLost)))
+
+    def test_runBatchStopsEveryTest(self) -> None:
+        """
+        L{LocalWorkerAMP.runBatch} starts every test it is given before
+        sending them and stops every one of them once the C{RunBatch} command
+        has succeeded.
+        """
+        started = []
+        stopped = []
+
+        class RecordingTestResult(TestResult):
+            def startTest(self, test: PyUnitTestCase) -> None:
+                started.append(test)
+                super().startTest(test)
+
+            def stopTest(self, test: PyUnitTestCase) -> None:
+                stopped.append(test)
+                super().stopTest(test)
+
+        cases = [
+            pyunitcases.PyUnitTest("test_pass"),
+            pyunitcases.PyUnitTest("test_error"),
+        ]
+        result = RecordingTestResult()
+        d = Deferred.fromCoroutine(self.managerAMP.runBatch(cases, result))
+        assert_that(started, equal_to(cases))
+        assert_that(stopped, equal_to([]))
+        self.flush()
+        assert_that(self.successResultOf(d)["success"], equal_to(True))
+        assert_that(stopped, equal_to(cases))
+        assert_that(
+            result,
+            matches_result(successes=equal_to(1), errors=has_length(1)),
+        )
+
+    def test_runBatchLost(self) -> None:
+        """
+        If the connection to the worker is lost before the C{RunBatch} command
+        completes, L{LocalWorkerAMP.runBatch} reports the reason as an error
+        for each test without an outcome, and nothing else for the others.
+        """
+        passCase = pyunitcases.PyUnitTest("test_pass")
+        lostCase = pyunitcases.PyUnitTest("test_fail")
+        result = TestResult()
+        d = Deferred.fromCoroutine(
+            self.managerAMP.runBatch([passCase, lostCase], result)
+        )
+        self.managerAMP.addSuccess(passCase.id())
+        self.managerAMP.connectionLost(Failure(ConnectionLost()))
+        self.assertEqual({"success": False}, self.successResultOf(d))
+        assert_that(
+            result,
+            matches_result(successes=equal_to(1), errors=has_length(1)),
+        )
+        [(actualCase, failure)] = result.errors
+        assert_that(actualCase, equal_to(lostCase))
+        assert_that(failure, isFailure(type=equal_to(ConnectionLost)))
+
     def test_testWrite(self) -> None:
         """
         L{LocalWorkerAMP.testWrite} writes the data received to its test
@@ -18,7 +18,11 @@ from twisted.trial._dist import (
     workercommands,
     workertrial,
 )
-from twisted.trial._dist.workertrial import WorkerLogObserver, main
+from twisted.trial._dist.workertrial import (
+    WorkerLogObserver,
+    _FlushingFileWrapper,
+    main,
+)
 from twisted.trial.unittest import TestCase
 
 
@@ -48,6 +52,29 @@ class WorkerLogObserverTests(TestCase):
         self.assertEqual(calls, [(managercommands.TestWrite, {"out": "Some log"})])
 
 
+class FlushingFileWrapperTests(TestCase):
+    """
+    Tests for L{_FlushingFileWrapper}.
+    """
+
+    def test_write(self):
+        """
+        L{_FlushingFileWrapper.write} writes the data to its file and then
+        flushes the file.
+        """
+        calls = []
+
+        class RecordingFile:
+            def write(self, data):
+                calls.append(("write", data))
+
+            def flush(self):
+                calls.append(("flush",))
+
+        _FlushingFileWrapper(RecordingFile()).write(b"some data")
+        self.assertEqual([("write", b"some data"), ("flush",)], calls)
+
+
 class MainTests(TestCase):
     """
     Tests for L{main}.
@@ -10,7 +10,16 @@ This module implements the worker classes.
 """
 
 import os
-from typing import Awaitable, Callable, Dict, List, Optional, TextIO, TypeVar
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    TypeVar,
+)
 from unittest import TestCase
 
 from zope.interface import implementer
@@ -59,6 +68,18 @@ class RunResult(TypedDict):
     success: bool
 
 
+class RunBatchResult(RunResult, total=False):
+    """
+    Represent the result of a L{workercommands.RunBatch} command.
+
+    @ivar durations: How long each of the tests took to run, in seconds, in
+        the order they were given.  This is missing if the tests could not
+        all be run.
+    """
+
+    durations: List[float]
+
+
 class Worker(Protocol):
     """
     An object that can run actions.
@@ -69,11 +90,47 @@ class Worker(Protocol):
         Run a test case.
         """
 
+    async def runBatch(
+        self, cases: Sequence[TestCase], result: TestResult
+    ) -> RunBatchResult:
+        """
+        Run several test cases, one after another.
+        """
+
 
 _T = TypeVar("_T")
 WorkerAction = Callable[[Worker], Awaitable[_T]]
 
 
+class TestLog(Protocol):
+    """
+    The overall log which output from the tests run by every worker is
+    written to.
+    """
+
+    @property
+    def name(self) -> str:
+        """
+        The name of the file the log is written to.
+        """
+
+    @property
+    def closed(self) -> bool:
+        """
+        Whether the log has been closed.
+        """
+
+    def write(self, data: str) -> object:
+        """
+        Add some text to the log.
+        """
+
+    def close(self) -> None:
+        """
+        Finish writing the log.
+        """
+
+
 class WorkerProtocol(AMP):
     """
     The worker-side trial distributed protocol.
@@ -86,16 +143,34 @@ class WorkerProtocol(AMP):
         self._result = WorkerReporter(self)
         self._forceGarbageCollection = forceGarbageCollection
 
-    @workercommands.Run.responder
-    async def run(self, testCase: str) -> RunResult:
+    def _runTest(self, testCase: str) -> Sequence[Deferred[object]]:
         """
         Run a test case by name.
+
+        @return: The L{Deferred}s for reporting the results of the test to
+            the peer.  Some of them may not have fired yet.
         """
+        results: Sequence[Deferred[object]]
         with self._result.gatherReportingResults() as results:
             case = self._loader.loadByName(testCase)
             suite = TrialSuite([case], self._forceGarbageCollection)
             suite.run(self._result)
+        return results
+
+    async def _checkReporting(
+        self, testCase: str, results: Sequence[Deferred[object]]
+    ) -> bool:
+        """
+        Wait for the results of a test to be reported to the peer and deal
+        with any errors reporting them.
 
+        @param testCase: The name of the test the results belong to.
+
+        @param results: The reporting L{Deferred}s returned by L{_runTest}.
+
+        @return: C{True} if all of the results were reported successfully,
+            C{False} otherwise.
+        """
         allSucceeded = True
         for (success, result) in await DeferredList(results, consumeErrors=True):
             if success:
@@ -124,7 +199,39 @@ class WorkerProtocol(AMP):
                     "Additionally, reporting the reporting failure failed."
                 )
 
-        return {"success": allSucceeded}
+        return allSucceeded
+
+    @workercommands.Run.responder
+    async def run(self, testCase: str) -> RunResult:
+        """
+        Run a test case by name.
+        """
+        results = self._runTest(testCase)
+        return {"success": await self._checkReporting(testCase, results)}
+
+    @workercommands.RunBatch.responder
+    async def runBatch(self, testCases: List[str]) -> RunBatchResult:
+        """
+        Run several test cases by name, one after another, timing each of
+        them.
+
+        Each test is started as soon as the previous one is over, without
+        waiting for the peer to acknowledge its results.
+        """
+        reporting = []
+        durations = []
+        for testCase in testCases:
+            reporting.append((testCase, self._runTest(testCase)))
+            # Use the time the reporter measured between starting and stopping
+            # the test.  Timing all of _runTest would also count work done
+            # once per process, such as importing the reactor, against
+            # whichever test happens to run first.
+            durations.append(self._result._lastTime)
+        allSucceeded = True
+        for testCase, results in reporting:
+            if not await self._checkReporting(testCase, results):
+                allSucceeded = False
+        return {"success": allSucceeded, "durations": durations}
 
     @workercommands.Start.responder
     def start(self, directory):
@@ -139,11 +246,21 @@ class WorkerProtocol(AMP):
 class LocalWorkerAMP(AMP):
     """
     Local implementation of the manager commands.
+
+    @ivar _running: The test cases which have been sent to the worker and have
+        not yet completed, keyed by their identifiers.  Several tests may be
+        outstanding at once, so results reported by the worker are matched up
+        with their test case using the test name they carry.
+
+    @ivar _reported: The identifiers of the test cases in C{_running} for
+        which the worker has reported an outcome.
     """
 
     def __init__(self, boxReceiver=None, locator=None):
         super().__init__(boxReceiver, locator)
         self._streams = StreamReceiver()
+        self._running: Dict[str, TestCase] = {}
+        self._reported: Set[str] = set()
 
     @StreamOpen.responder
     def streamOpen(self):
@@ -154,12 +271,22 @@ class LocalWorkerAMP(AMP):
         self._streams.write(streamId, data)
         return {}
 
+    def _outcomeFor(self, testName: str) -> TestCase:
+        """
+        Look up a running test case and note that an outcome has been reported
+        for it.
+
+        @param testName: The identifier of the test case.
+        """
+        self._reported.add(testName)
+        return self._running[testName]
+
     @managercommands.AddSuccess.responder
     def addSuccess(self, testName):
         """
         Add a success to the reporter.
         """
-        self._result.addSuccess(self._testCase)
+        self._result.addSuccess(self._outcomeFor(testName))
         return {"success": True}
 
     def _buildFailure(
@@ -218,7 +345,7 @@ class LocalWorkerAMP(AMP):
         # connection to the main process but we must give *some* Exception
         # (not a str) to the test result object.
         failure = self._buildFailure(WorkerException(error), errorClass, frames)
-        self._result.addError(self._testCase, failure)
+        self._result.addError(self._outcomeFor(testName), failure)
         return {"success": True}
 
     @managercommands.AddFailure.responder
@@ -245,7 +372,7 @@ class LocalWorkerAMP(AMP):
         ]
         # See addError for info about use of WorkerException here.
         failure = self._buildFailure(WorkerException(fail), failClass, frames)
-        self._result.addFailure(self._testCase, failure)
+        self._result.addFailure(self._outcomeFor(testName), failure)
         return {"success": True}
 
     @managercommands.AddSkip.responder
@@ -253,7 +380,7 @@ class LocalWorkerAMP(AMP):
         """
         Add a skip to the reporter.
         """
-        self._result.addSkip(self._testCase, reason)
+        self._result.addSkip(self._outcomeFor(testName), reason)
         return {"success": True}
 
     @managercommands.AddExpectedFailure.responder
@@ -268,7 +395,7 @@ class LocalWorkerAMP(AMP):
         """
         error = b"".join(self._streams.finish(errorStreamId)).decode("utf-8")
         _todo = Todo("<unknown>" if todo is None else todo)
-        self._result.addExpectedFailure(self._testCase, error, _todo)
+        self._result.addExpectedFailure(self._outcomeFor(testName), error, _todo)
         return {"success": True}
 
     @managercommands.AddUnexpectedSuccess.responder
@@ -276,7 +403,7 @@ class LocalWorkerAMP(AMP):
         """
         Add an unexpected success to the reporter.
         """
-        self._result.addUnexpectedSuccess(self._testCase, todo)
+        self._result.addUnexpectedSuccess(self._outcomeFor(testName), todo)
         return {"success": True}
 
     @managercommands.TestWrite.responder
@@ -284,23 +411,65 @@ class LocalWorkerAMP(AMP):
         """
         Print test output from the worker.
         """
+        # The stream is not flushed here.  The test log flushes itself from
+        # a background thread and waiting for it would block the reactor.
         self._testStream.write(out + "\n")
-        self._testStream.flush()
         return {"success": True}
 
     async def run(self, testCase: TestCase, result: TestResult) -> RunResult:
         """
         Run a test.
+
+        If the worker cannot finish running the test, perhaps because its
+        process ended, the reason is reported as an error for the test unless
+        the worker already reported an outcome for it.
         """
-        self._testCase = testCase
+        testCaseId = testCase.id()
+        self._running[testCaseId] = testCase
         self._result = result
         self._result.startTest(testCase)
-        testCaseId = testCase.id()
         try:
             return await self.callRemote(workercommands.Run, testCase=testCaseId)  # type: ignore[no-any-return]
+        except Exception:
+            if testCaseId not in self._reported:
+                self._result.addError(testCase, Failure())
+            return {"success": False}
         finally:
+            del self._running[testCaseId]
+            self._reported.discard(testCaseId)
             self._result.stopTest(testCase)
 
+    async def runBatch(
+        self, testCases: Sequence[TestCase], result: TestResult
+    ) -> RunBatchResult:
+        """
+        Run several tests with a single command.
+
+        If the worker cannot finish running the tests, perhaps because its
+        process ended, the reason is reported as an error for each of the
+        tests which the worker did not report an outcome for.
+        """
+        testCaseIds = [testCase.id() for testCase in testCases]
+        self._result = result
+        for testCaseId, testCase in zip(testCaseIds, testCases):
+            self._running[testCaseId] = testCase
+            self._result.startTest(testCase)
+        try:
+            return await self.callRemote(  # type: ignore[no-any-return]
+                workercommands.RunBatch, testCases=testCaseIds
+            )
+        except Exception:
+            failure = Failure()
+            for testCaseId, testCase in zip(testCaseIds, testCases):
+                if testCaseId not in self._reported:
+                    self._result.addError(testCase, failure)
+            return {"success": False}
+        finally:
+            for testCaseId, testCase in zip(testCaseIds, testCases):
+                self._running.pop(testCaseId, None)
+                self._reported.discard(testCaseId)
+                self._result.stopTest(testCase)
+
     def setTestStream(self, stream):
         """
         Set the stream used to log output from tests.
@@ -381,7 +550,7 @@ class LocalWorker(ProcessProtocol):
         self,
         ampProtocol: LocalWorkerAMP,
         logDirectory: FilePath,
-        logFile: TextIO,
+        logFile: TestLog,
     ):
         self._ampProtocol = ampProtocol
         self._logDirectory = logDirectory
@@ -7,7 +7,7 @@ Commands for telling a worker to load tests or run tests.
 @since: 12.3
 """
 
-from twisted.protocols.amp import Boolean, Command, Unicode
+from twisted.protocols.amp import Boolean, Command, Float, ListOf, Unicode
 
 NativeString = Unicode
 
@@ -21,6 +21,18 @@ class Run(Command):
     response = [(b"success", Boolean())]
 
 
+class RunBatch(Command):
+    """
+    Run several tests, one after another.
+
+    The response includes how long each of the tests took to run, in seconds,
+    in the order they were given.
+    """
+
+    arguments = [(b"testCases", ListOf(NativeString()))]
+    response = [(b"success", Boolean()), (b"durations", ListOf(Float()))]
+
+
 class Start(Command):
     """
     Set up the worker process, giving the running directory.
@@ -44,6 +44,23 @@ class WorkerLogObserver:
         self.protocol.callRemote(managercommands.TestWrite, out=text)
 
 
+class _FlushingFileWrapper(FileWrapper):
+    """
+    A L{FileWrapper} which flushes its file after every write.
+
+    A worker may run several tests while handling a single command.  Flushing
+    each message as it is written means the results of the tests which have
+    already run reach the manager even if a later test ends the process.
+    """
+
+    def write(self, data: bytes) -> None:
+        try:
+            self.file.write(data)
+            self.file.flush()
+        except BaseException:
+            self.handleException()
+
+
 def main(_fdopen=os.fdopen):
     """
     Main function to be run if __name__ == "__main__".
@@ -60,7 +77,7 @@ def main(_fdopen=os.fdopen):
 
     protocolIn = _fdopen(_WORKER_AMP_STDIN, "rb")
     protocolOut = _fdopen(_WORKER_AMP_STDOUT, "wb")
-    workerProtocol.makeConnection(FileWrapper(protocolOut))
+    workerProtocol.makeConnection(_FlushingFileWrapper(protocolOut))
 
     observer = WorkerLogObserver(workerProtocol)
     startLoggingWithObserver(observer.emit, False)
@@ -0,0 +1 @@
+``trial -jN`` now sends tests to workers in batches of up to 8, using smaller batches as the remaining tests run out.
@@ -0,0 +1 @@
+``trial -jN`` now keeps up to 4 requests in flight to each worker instead of waiting for each test to be reported before sending the next one.  The number can be changed by setting the ``TRIAL_DIST_PIPELINE`` environment variable.  ``--exitfirst`` still runs one test at a time.
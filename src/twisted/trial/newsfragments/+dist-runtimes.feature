@@ -0,0 +1 @@
+``trial -jN`` now records how long each test took in a ``.runtimes.json`` file beside its working directory (``_trial_temp.runtimes.json`` by default) and starts the slowest tests first on the next run.
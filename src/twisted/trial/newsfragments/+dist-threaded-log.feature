@@ -0,0 +1 @@
+``trial -jN`` now writes the overall test log from a background thread, so workers with a lot of output no longer block the reporting of results.